@@ -3,19 +3,39 @@ Functions to convert data from one format to another
 """
 
 import logging
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 from pandas import DataFrame, to_datetime
 
 from trade.constant import TICKER_INTERVAL_MINUTES
 
 logger = logging.getLogger(__name__)
 
+# Layout of a ticker array, one record per candle (same columns as ccxt.fetch_ohlcv)
+TICKER_DTYPE = np.dtype([('date', 'i8'), ('open', 'f8'), ('high', 'f8'), ('low', 'f8'),
+                         ('close', 'f8'), ('volume', 'f8')])
+
+
+def ticker_to_ndarray(ticker: list) -> np.ndarray:
+    """
+    Converts a ticker-list (format ccxt.fetch_ohlcv) to a structured numpy array
+    :param ticker: ticker list, as returned by exchange.async_get_candle_history
+    :return: numpy array with dtype TICKER_DTYPE
+    """
+    rows = np.asarray(ticker, dtype=np.float64).reshape(-1, len(TICKER_DTYPE.names))
+    tickerarray = np.empty(len(rows), dtype=TICKER_DTYPE)
+    for i, name in enumerate(TICKER_DTYPE.names):
+        tickerarray[name] = rows[:, i]
+    return tickerarray
+
 
 def parse_ticker_dataframe(ticker: list, ticker_interval: str,
                            fill_missing: bool = True) -> DataFrame:
     """
     Converts a ticker-list (format ccxt.fetch_ohlcv) to a Dataframe
-    :param ticker: ticker list, as returned by exchange.async_get_candle_history
+    :param ticker: ticker list, as returned by exchange.async_get_candle_history,
+                   or a ticker array (see ticker_to_ndarray)
     :param ticker_interval: ticker_interval (e.g. 5m). Used to fill up eventual missing data
     :param fill_missing: fill up missing candles with 0 candles
                          (see ohlcv_fill_up_missing_data for details)
@@ -53,30 +73,63 @@ def ohlcv_fill_up_missing_data(dataframe: DataFrame, ticker_interval: str) -> Da
     """
     Fills up missing data with 0 volume rows,
     using the previous close as price for "open", "high" "low" and "close", volume is set to 0
+    Expects a dataframe sorted by date without duplicates (as built by parse_ticker_dataframe)
     """
-    ohlc_dict = {
-        'open': 'first',
-        'high': 'max',
-        'low': 'min',
-        'close': 'last',
-        'volume': 'sum'
-    }
+    if dataframe.empty:
+        return dataframe
     tick_mins = TICKER_INTERVAL_MINUTES[ticker_interval]
-    # Resample to create "NAN" values
-    df = dataframe.resample(f'{tick_mins}min', on='date').agg(ohlc_dict)
+    freq = f'{tick_mins}min'
+    freq_ns = tick_mins * 60 * 10**9
+    if (dataframe['date'].astype('int64') % freq_ns).any():
+        # Candles off the interval grid need to be bucketed - resample to create "NAN" values
+        ohlc_dict = {
+            'open': 'first',
+            'high': 'max',
+            'low': 'min',
+            'close': 'last',
+            'volume': 'sum'
+        }
+        df = dataframe.resample(freq, on='date').agg(ohlc_dict)
+    else:
+        # Reindex on the full range of candles to create "NAN" rows
+        full_index = pd.date_range(dataframe['date'].iloc[0].floor(freq),
+                                   dataframe['date'].iloc[-1].floor(freq),
+                                   freq=freq, name='date')
+        df = dataframe.set_index('date').reindex(full_index)
     # Forwardfill close for missing columns
-    df['close'] = df['close'].fillna(method='ffill')
+    df['close'] = df['close'].ffill()
     # Use close for "open, high, low"
     df.loc[:, ['open', 'high', 'low']] = df[['open', 'high', 'low']].fillna(
            value={'open': df['close'],
                    'high': df['close'],
                    'low': df['close'],
                    })
+    df['volume'] = df['volume'].fillna(0)
     df.reset_index(inplace=True)
     logger.debug(f"Missing data fillup: before: {len(dataframe)} - after: {len(df)}")
     return df
 
 
+def dataframe_to_ipc(dataframe: DataFrame) -> bytes:
+    """
+    Serialize a Dataframe to the Arrow IPC stream format
+    Used to send dataframes between processes without pickling them column by column
+    """
+    table = pa.Table.from_pandas(dataframe, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    writer = pa.RecordBatchStreamWriter(sink, table.schema)
+    writer.write_table(table)
+    writer.close()
+    return sink.getvalue().to_pybytes()
+
+
+def ipc_to_dataframe(buffer: bytes) -> DataFrame:
+    """
+    Deserialize a Dataframe serialized by dataframe_to_ipc
+    """
+    return pa.ipc.open_stream(buffer).read_all().to_pandas()
+
+
 def order_book_to_dataframe(bids: list, asks: list) -> DataFrame:
         """
         Gets order book list, returns dataframe with below format per suggested by creslin
@@ -6,7 +6,7 @@ Common Interface for bot and strategy to access data.
 """
 import logging
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 from pandas import DataFrame
 
@@ -22,6 +22,13 @@ class DataProvider(object):
     def __init__(self, config: dict, exchange: Exchange) -> None:
         self._config = config
         self._exchange = exchange
+        self._datadir = Path(config['datadir']) if config.get('datadir') else None
+        self._tick_interval = config.get('ticker_interval')
+        # runmode doesn't change during a session
+        self._runmode = RunMode(config.get('runmode', RunMode.OTHER))
+        self._is_live_or_dry = self._runmode in (RunMode.DRY_RUN, RunMode.LIVE)
+        # pairs cached by the exchange, updated with each refresh
+        self._pairs_cache: Optional[Tuple[Tuple[str, str], ...]] = None
 
     def refresh(self, pairlist: List[Tuple[str, str]],
                 helping_pairs: List[Tuple[str, str]] = None) -> None:
@@ -35,33 +42,36 @@ class DataProvider(object):
             self._exchange.refresh_latest_ohlcv(pairlist + helping_pairs)
         else:
             self._exchange.refresh_latest_ohlcv(pairlist)
-
+        self._pairs_cache = tuple(self._exchange.klines_keys())
 
     @property
-    def available_pairs(self) -> List[Tuple[str, str]]:
+    def available_pairs(self) -> Tuple[Tuple[str, str], ...]:
         """
-        Return a list of tuples containing pair, tick_interval for which data is currently cached.
+        Return a tuple of tuples containing pair, tick_interval for which data is currently cached.
         Should be whitelist + open trades.
+        Snapshot taken at the last refresh.
         :return:
         """
 
-        return list(self._exchange.klines.keys())
+        return self._pairs_cache or ()
 
-    def ohlcv(self, pair: str, tick_interval: str = None, copy: bool = True) -> DataFrame:
+    def ohlcv(self, pair: str, tick_interval: str = None, copy: bool = False) -> DataFrame:
         """
         get ohlcv data for the data given pair as DataFrame
         Please check `available_pairs` to verify which pairs are currently cached.
+        By default the DataFrame cached by the exchange is returned, it must not be modified.
+        Use copy=True (or call .copy() on the result) to get a DataFrame which can be changed.
 
         :param pair:
         :param tick_interval:
-        :param copy:
+        :param copy: copy the cached DataFrame before returning it
         :return:
         """
-        if self.runmode in (RunMode.DRY_RUN, RunMode.LIVE):
+        if self._is_live_or_dry:
             if tick_interval:
                 pairtick = (pair, tick_interval)
             else:
-                pairtick = (pair, self._config['tick_interval'])
+                pairtick = (pair, self._tick_interval)
 
             return self._exchange.klines(pairtick, copy=copy)
         else:
@@ -76,9 +86,7 @@ class DataProvider(object):
         """
         return load_pair_history(pair=pair, ticker_interval=ticker_interval,
                                  refresh_pairs= False,
-                                 datadir=Path(self._config['datadir']) if self._config.get(
-                                     'datadir'
-                                 ) else None)
+                                 datadir=self._datadir)
     def ticker(self, pair: str):
         """
         Return last ticker data
@@ -102,5 +110,5 @@ class DataProvider(object):
         Get runmode of the bot
         can be "live", "dry-run", "backtest", "edgecli", "hyperopt" or "other".
         """
-        return RunMode(self._config.get('runmode', RunMode.OTHER))
+        return self._runmode
 
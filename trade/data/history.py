@@ -5,25 +5,46 @@ includes:
 * download data from exchange and store to disk
 """
 import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache, partial
 from pathlib import Path
 from typing import Optional, List, Dict, Tuple, Any
 
 import arrow
+import numpy as np
+import pandas as pd
 from pandas import DataFrame
 
 from trade import misc, constant, OperationalException
-from trade.data.converter import parse_ticker_dataframe
+from trade.data.converter import (TICKER_DTYPE, dataframe_to_ipc, ipc_to_dataframe,
+                                  parse_ticker_dataframe, ticker_to_ndarray)
 from trade.exchange import Exchange
 from trade.arguments import TimeRange
 
 logger = logging.getLogger(__name__)
 
+# Starting a process pool only pays off when loading more pairs than this
+PROCESS_POOL_MIN_PAIRS = 4
 
-def trim_tickerlist(tickerlist: List[Dict], timerange: TimeRange) -> List[Dict]:
+
+def _format_ms(date_ms: int) -> str:
+    """
+    Format a timestamp in ms as readable UTC date (without going through arrow)
+    """
+    return datetime.fromtimestamp(date_ms / 1000, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def trim_tickerlist(tickerlist: np.ndarray, timerange: TimeRange) -> np.ndarray:
     """
     Trim tickerlist based on given timerange
+    :param tickerlist: ticker array (see converter.ticker_to_ndarray)
+    :return: view on the trimmed ticker array
     """
-    if not tickerlist:
+    if not len(tickerlist):
         return tickerlist
 
     start_index = 0
@@ -34,42 +55,133 @@ def trim_tickerlist(tickerlist: List[Dict], timerange: TimeRange) -> List[Dict]:
     if timerange.starttype == 'index':
         start_index = timerange.startts
     elif timerange.starttype == 'date':
-        while (start_index < len(tickerlist) and
-               tickerlist[start_index][0] < timerange.startts * 100):
-            start_index += 1
+        # tickerlist is sorted by date, so bisect instead of scanning row by row
+        start_index = int(np.searchsorted(tickerlist['date'], timerange.startts * 1000,
+                                          side='left'))
 
     if start_index > stop_index:
         raise ValueError(f'The timerange [{timerange.startts},{timerange.stopts}] is incorrect')
 
     return tickerlist[start_index:stop_index]
 
+
+def _load_feather_cache(file: Path, cachefile: Path) -> Optional[np.ndarray]:
+    """
+    Load the ticker array from its .feather cache.
+    The cache is only used if it is at least as recent as the .json / .json.gz data
+    :return: ticker array or None if there is no valid cache
+    """
+    if not cachefile.is_file():
+        return None
+    sources = [f for f in (file, file.with_suffix(file.suffix + '.gz')) if f.is_file()]
+    if not sources or cachefile.stat().st_mtime < max(f.stat().st_mtime for f in sources):
+        return None
+    logger.debug('Loading ticker data from cache %s', cachefile)
+    try:
+        return np.asarray(pd.read_feather(cachefile).to_records(index=False),
+                          dtype=TICKER_DTYPE)
+    except (OSError, ValueError, KeyError):
+        # pyarrow.ArrowInvalid is a ValueError, raised for truncated / corrupt files
+        logger.warning('Ignoring unreadable ticker data cache %s', cachefile)
+        return None
+
+
+def _store_feather_cache(cachefile: Path, pair_data: np.ndarray) -> None:
+    """
+    Store the ticker array as .feather next to the .json data
+    The cache is written to a temporary file first and moved into place,
+    so an interrupted write never leaves a partial cache behind
+    """
+    tmpfile = None
+    try:
+        with tempfile.NamedTemporaryFile(dir=str(cachefile.parent), prefix=cachefile.name,
+                                         suffix='.tmp', delete=False) as fp:
+            tmpfile = fp.name
+        DataFrame(pair_data).to_feather(tmpfile)
+        os.replace(tmpfile, str(cachefile))
+    except OSError:
+        logger.warning('Could not write ticker data cache %s', cachefile)
+        if tmpfile and os.path.exists(tmpfile):
+            os.remove(tmpfile)
+
+
 def load_tickerdata_file(datadir: Optional[Path], pair: str, ticker_interval: str,
-                         timerange: Optional[TimeRange] = None) -> Optional[list]:
+                         timerange: Optional[TimeRange] = None,
+                         invalidate_cache: bool = False) -> Optional[np.ndarray]:
     """
     Load a pair from file, either .json.gz or .json
-    :return tickerlist or None if unsuccesful
+    Decoded files are cached as .feather, which is used as long as the .json data didn't change
+    :param invalidate_cache: ignore the .feather cache and rebuild it
+    :return ticker array (see converter.ticker_to_ndarray) or None if unsuccesful
     """
 
-    path = make_testdata_path(datadir)
-    pair_s = pair.replace('/', '_')
-    file = path.joinpath(f'{pair_s}-{ticker_interval}.json')
+    file = _pair_file(datadir, pair, ticker_interval)
+    cachefile = file.with_suffix('.feather')
 
-    pair_data = misc.file_load_json(file)
-    if not pair_data:
-        return None
+    pair_data = None if invalidate_cache else _load_feather_cache(file, cachefile)
+    if pair_data is None:
+        tickerlist = misc.file_load_json(file)
+        if not tickerlist:
+            return None
+        pair_data = ticker_to_ndarray(tickerlist)
+        _store_feather_cache(cachefile, pair_data)
     if timerange:
         pair_data = trim_tickerlist(pair_data, timerange)
     return pair_data
 
+
+def _parse_pair_history(pair: str, ticker_interval: str,
+                        datadir: Optional[Path],
+                        timerange: TimeRange,
+                        fill_up_missing: bool,
+                        invalidate_cache: bool = False) -> Optional[DataFrame]:
+    """
+    Load and parse the ticker history of a pair from disk.
+    """
+    pairdata = load_tickerdata_file(datadir, pair, ticker_interval, timerange=timerange,
+                                    invalidate_cache=invalidate_cache)
+
+    if pairdata is not None and len(pairdata):
+        start_ms = int(pairdata['date'][0])
+        end_ms = int(pairdata['date'][-1])
+        if timerange.starttype == 'date' and start_ms > timerange.startts * 1000:
+            logger.warning('Missing data at start for pair %s, data starts at %s',
+                           pair, _format_ms(start_ms))
+        if timerange.stoptype == 'date' and end_ms < timerange.stopts * 1000:
+            logger.warning('Missing data at end for pair %s, data ands at %s',
+                           pair, _format_ms(end_ms))
+        return parse_ticker_dataframe(pairdata, ticker_interval, fill_up_missing)
+    else:
+        logger.warning('No data for pair: "%s", Interval: %s. '
+                       'Use --refresh-pairs-cached to download the data',
+                       pair, ticker_interval)
+        return None
+
+
+# Parsed histories by arguments, for repeated lookups of the same pair
+# (e.g. DataProvider.historic_ohlcv). Cleared whenever new data is stored.
+# Callers must not modify the returned DataFrames.
+_load_pair_history_cached = lru_cache(maxsize=128)(_parse_pair_history)
+
+
 def load_pair_history(pair: str, ticker_interval: str,
                       datadir: Optional[Path],
                       timerange: TimeRange = TimeRange(None, None, 0, 0),
                       refresh_pairs: bool = False,
                       exchange: Optional[Exchange] = None,
-                      fill_up_missing: bool = True
+                      fill_up_missing: bool = True,
+                      copy: bool = True,
+                      invalidate_cache: bool = False,
+                      cache: bool = True
                       ) -> DataFrame:
     """
     Loads cached ticker history for the given pair.
+    Parsed data is kept in memory, so repeated calls with the same arguments don't hit the disk.
+    :param copy: return a copy of the in-memory DataFrame. Only use False if the DataFrame
+                 is not modified by the caller.
+    :param cache: keep the parsed data in memory. Use False for one-off loads (e.g. load_data),
+                  the DataFrame is then parsed from disk and returned without copy.
+    :param invalidate_cache: drop in-memory data and rebuild the .feather cache
     :return: DataFrame with ohlcv data
     """
     # If the user force the refresh of pairs
@@ -79,44 +191,93 @@ def load_pair_history(pair: str, ticker_interval: str,
                                        "calling load_data with refresh_pairs=True")
         logger.info('Download data for pair and store them in %s', datadir)
         download_pair_history(datadir= datadir, exchange= exchange, pair=pair,
-                              ticker_interval= ticker_interval, timerange=timerange)
-        pairdata = load_tickerdata_file(datadir, pair, ticker_interval, timerange=timerange)
-
-        if pairdata:
-            if timerange.starttype == 'date' and pairdata[0][0] > timerange.startts * 1000:
-                logger.warning('Missing data at start for pair %s, data starts at %s',
-                               pair, arrow.get(pairdata[0][0] // 1000).strftime('%Y-%m-%d %H:%M:%S'))
-            if timerange.stoptype == 'date' and pairdata[-1][0] < timerange.stopts * 1000:
-                logger.warning('Missing data at end for pair %s, data ands at %s',
-                               pair,
-                               arrow.get(pairdata[-1][0] // 1000).strftime('%Y-%m-%d %H:%M:%S'))
-            return parse_ticker_dataframe(pairdata, ticker_interval, fill_up_missing)
-        else:
-            logger.warning('No data for pair: "%s", Interval: %s. ',
-                           'Use --refresh-pairs-cached to download the data',
-                           pair, ticker_interval)
-            return None
+                              tick_interval=ticker_interval, timerange=timerange)
+
+    if not cache:
+        return _parse_pair_history(pair, ticker_interval, datadir, timerange, fill_up_missing,
+                                   invalidate_cache)
+
+    if invalidate_cache:
+        _load_pair_history_cached.cache_clear()
+    hist = _load_pair_history_cached(pair, ticker_interval, datadir, timerange, fill_up_missing,
+                                     invalidate_cache)
+    if hist is None:
+        return None
+    return hist.copy() if copy else hist
 
 
 def load_data(datadir: Optional[Path], ticker_interval: str, pairs: List[str],
               refresh_pairs: bool = False,
               exchange: Optional[Exchange] = None,
               timerange: TimeRange = TimeRange(None, None, 0, 0),
-              fill_up_missing: bool = True) -> Dict[str, DataFrame]:
+              fill_up_missing: bool = True,
+              max_workers: Optional[int] = None,
+              invalidate_cache: bool = False,
+              jobs: Optional[int] = None) -> Dict[str, DataFrame]:
     """
     Loads ticker history data for a list of pairs the given parameters
+    Pairs are read and parsed concurrently, downloads (refresh_pairs) are done
+    upfront in one batch by the exchange since its clients are not thread-safe.
+    :param max_workers: number of threads used to load the pairs (default: cpu count)
+    :param invalidate_cache: rebuild the .feather cache of the pairs
+    :param jobs: number of processes used to load the pairs. Processes are only used
+                 for more than PROCESS_POOL_MIN_PAIRS pairs, threads otherwise
     :return: dict(<pair>:<tickerlist>)
     """
-    result = {}
+    if refresh_pairs:
+        if not exchange:
+            raise OperationalException("Exchange needs to be initialized when "
+                                       "calling load_data with refresh_pairs=True")
+        logger.info('Download data for all pairs and store them in %s', datadir)
+        download_pairs_history(datadir=datadir, exchange=exchange, pairs=pairs,
+                               tick_interval=ticker_interval, timerange=timerange)
 
-    for pair in pairs:
-        hist = load_pair_history(pair=pair, ticker_interval=ticker_interval,
-                                 datadir=datadir, timerange=timerange,
-                                 refresh_pairs=refresh_pairs, exchange=exchange,
-                                 fill_up_missing=fill_up_missing)
-        if hist is not None:
-            result[pair] = hist
-    return result
+    kwargs = dict(ticker_interval=ticker_interval, datadir=datadir, timerange=timerange,
+                  fill_up_missing=fill_up_missing, invalidate_cache=invalidate_cache)
+
+    if jobs and jobs > 1 and len(pairs) > PROCESS_POOL_MIN_PAIRS:
+        # Dataframes are sent back from the workers in Arrow IPC format
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            return {pair: ipc_to_dataframe(hist) for pair, hist in
+                    zip(pairs, executor.map(partial(_load_pair_worker_ipc, **kwargs), pairs))
+                    if hist is not None}
+
+    worker = partial(_load_pair_worker, **kwargs)
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        return {pair: hist for pair, hist in zip(pairs, executor.map(worker, pairs))
+                if hist is not None}
+
+
+def _load_pair_worker(pair: str, ticker_interval: str, datadir: Optional[Path],
+                      timerange: TimeRange, fill_up_missing: bool,
+                      invalidate_cache: bool) -> Optional[DataFrame]:
+    """
+    Load the history of one pair for load_data.
+    Errors are logged and result in None, so one broken file doesn't abort loading all pairs
+    """
+    try:
+        return load_pair_history(pair=pair, ticker_interval=ticker_interval, datadir=datadir,
+                                 timerange=timerange, fill_up_missing=fill_up_missing,
+                                 invalidate_cache=invalidate_cache, cache=False)
+    except Exception:
+        logger.exception('Failed to load the pair: "%s", Interval: %s', pair, ticker_interval)
+        return None
+
+
+def _load_pair_worker_ipc(pair: str, **kwargs) -> Optional[bytes]:
+    """
+    Load the history of one pair in a worker process, see _load_pair_worker
+    :return: the DataFrame serialized with converter.dataframe_to_ipc, or None
+    """
+    hist = _load_pair_worker(pair, **kwargs)
+    if hist is None:
+        return None
+    try:
+        return dataframe_to_ipc(hist)
+    except Exception:
+        logger.exception('Failed to serialize the pair: "%s", Interval: %s',
+                         pair, kwargs.get('ticker_interval'))
+        return None
 
 
 def make_testdata_path(datadir: Optional[Path]) -> Path:
@@ -124,39 +285,110 @@ def make_testdata_path(datadir: Optional[Path]) -> Path:
     return datadir or (Path(__file__).parent.parent / "tests" / "testdata").resolve()
 
 
+@lru_cache(maxsize=1024)
+def _pair_file(datadir: Optional[Path], pair: str, ticker_interval: str) -> Path:
+    """
+    Return the path of the .json data file of a pair
+    Cached, since it is needed for every load and download of a pair
+    """
+    pair_s = pair.replace('/', '_')
+    return make_testdata_path(datadir).joinpath(f'{pair_s}-{ticker_interval}.json')
+
+
+@lru_cache(maxsize=None)
+def _line_offset_ms(tick_interval: str, num_lines: int) -> int:
+    """
+    Offset in ms covered by num_lines candles of tick_interval (negative for past candles)
+    """
+    return num_lines * constant.TICKER_INTERVAL_MINUTES[tick_interval] * 60 * 1000
+
+
 def load_cached_data_for_updating(filename: Path, tick_interval: str,
-                                  timerage: Optional[TimeRange]) -> Tuple[List[Any], Optional[int]]:
+                                  timerage: Optional[TimeRange]
+                                  ) -> Tuple[np.ndarray, Optional[int], Optional[int]]:
     """
     Load cached data and choose what part of the data should be updated
+    If the timerange starts before the cached data, the cache is kept and only the
+    missing candles before it need to be downloaded (prepend_since_ms)
     :param filename:
     :param tick_interval:
     :param timerage:
-    :return:
+    :return: tuple (cached data, since_ms, prepend_since_ms)
     """
     since_ms = None
+    prepend_since_ms = None
     # user sets timerange, so find the start time
     if timerage:
         if timerage.starttype == 'date':
             since_ms = timerage.startts * 1000
         elif timerage.stoptype == 'line':
-            num_minutes = timerage.stopts * constant.TICKER_INTERVAL_MINUTES[tick_interval]
-            since_ms = arrow.utcnow().shift(minutes=num_minutes).timestamp * 1000
+            since_ms = int(time.time() * 1000) + _line_offset_ms(tick_interval, timerage.stopts)
 
     # read the cached file
     if filename.is_file():
-        with open(filename, "rt") as file:
-            data = misc.json_load(file)
-            # remove the last item, could be incomplete candle
-            if data:
-                data.pop()
+        # remove the last item, could be incomplete candle
+        data = ticker_to_ndarray(misc.json_load_file(filename))[:-1]
     else:
-        data = []
-    if data:
-        if since_ms and since_ms < data[0][0]:
-            data = []
-        else:
-            since_ms = data[-1][0] + 1
-    return (data, since_ms)
+        data = ticker_to_ndarray([])
+    if len(data):
+        if since_ms and since_ms < data['date'][0]:
+            prepend_since_ms = since_ms
+        since_ms = int(data['date'][-1]) + 1
+    return (data, since_ms, prepend_since_ms)
+
+
+def _prepare_pair_download(datadir: Optional[Path], pair: str, tick_interval: str,
+                           timerange: Optional[TimeRange]
+                           ) -> Tuple[Path, np.ndarray, int, Optional[int]]:
+    """
+    Find the cache file of a pair and the point from which data needs to be downloaded
+    :return: tuple (filename, cached data, since_ms, prepend_since_ms)
+    """
+    filename = _pair_file(datadir, pair, tick_interval)
+
+    data, since_ms, prepend_since_ms = load_cached_data_for_updating(filename, tick_interval,
+                                                                     timerange)
+    logger.debug("Current Start: %s",
+                 misc.format_ms_time(data['date'][0]) if len(data) else 'None')
+    logger.debug("Current End: %s",
+                 misc.format_ms_time(data['date'][-1]) if len(data) else 'None')
+
+    # Default since_ms to 30 days if nothing is given
+    if not since_ms:
+        since_ms = int(arrow.utcnow().shift(days=-30).float_timestamp) * 1000
+    return filename, data, since_ms, prepend_since_ms
+
+
+def _store_pair_download(filename: Path, data: np.ndarray, new_data: List[Any],
+                         head_data: Optional[List[Any]] = None) -> None:
+    """
+    Merge newly downloaded candles into the cached data and store them to disk
+    If the candles continue the cached data, they are appended to the file
+    (replacing the possibly incomplete last candle), otherwise the file is rewritten
+    :param head_data: candles downloaded for the time before the cached data
+    """
+    if not head_data and len(data) and filename.is_file():
+        # data is the file content without its last candle, new_data continues it
+        if not new_data:
+            return
+        logger.debug("New Start: %s", misc.format_ms_time(data['date'][0]))
+        logger.debug("New End: %s", misc.format_ms_time(new_data[-1][0]))
+        misc.file_append_json(filename, new_data, replace_last=True)
+    else:
+        data = np.concatenate((ticker_to_ndarray(head_data or []), data,
+                               ticker_to_ndarray(new_data)))
+        # drop duplicate candles, np.unique also sorts by date
+        data = data[np.unique(data['date'], return_index=True)[1]]
+
+        logger.debug("New Start: %s",
+                     misc.format_ms_time(data['date'][0]) if len(data) else 'None')
+        logger.debug("New End: %s",
+                     misc.format_ms_time(data['date'][-1]) if len(data) else 'None')
+
+        misc.file_dump_json(filename, data.tolist())
+    # in-memory histories are outdated now
+    _load_pair_history_cached.cache_clear()
+
 
 def download_pair_history(datadir: Optional[Path],
                           exchange: Exchange, pair: str, tick_interval: str = '5m',
@@ -165,7 +397,7 @@ def download_pair_history(datadir: Optional[Path],
     Download the latest ticker intervals from the exchange for the pair passed in parameters
     The data is downloaded starting form the last correct ticker interval data that
     exists in a cache. If timerange starts earlier than the data in the cache,
-    the full data will be re-downloaded
+    the missing data before the cache is downloaded as well
     Based on @Rybolov work: https://github.com/rybolov/freqtrade-data
     :param pair: pair to download
     :param tick_interval: ticker interval
@@ -174,29 +406,63 @@ def download_pair_history(datadir: Optional[Path],
 
     """
     try:
-        path = make_testdata_path(datadir)
-        filepair = pair.replace("/", "_")
-        filename = path.joinpath(f'{filepair}-{tick_interval}.json')
         logger.info('Download the pair: "%s", Interval: %s', pair, tick_interval)
+        filename, data, since_ms, prepend_since_ms = _prepare_pair_download(
+            datadir, pair, tick_interval, timerange)
 
-        data, since_ms = load_cached_data_for_updating(filename, tick_interval, timerange)
-        logger.debug("Current Start: %s", misc.format_ms_time(data[1][0]) if data else 'None')
-        logger.debug("Current End: %s", misc.format_ms_time(data[-1][0]) if data else 'None')
-
-        # Default since_ms to 30 days if nothing is given
         new_data = exchange.get_history(pair=pair, tick_interval=tick_interval,
-                                        since_ms=since_ms if since_ms
-                                        else
-                                        int(arrow.utcnow().shift(days=30).float_timestamp) * 1000)
-        data.extend(new_data)
-
-        logger.debug("New Start: %s", misc.format_ms_time(data[0][0]))
-        logger.debug("New End: %s", misc.format_ms_time(data[-1][0]))
-
-        misc.file_dump_json(filename, data)
+                                        since_ms=since_ms)
+        head_data = None
+        if prepend_since_ms:
+            head_data = exchange.get_history(pair=pair, tick_interval=tick_interval,
+                                             since_ms=prepend_since_ms,
+                                             until_ms=int(data['date'][0]))
+        _store_pair_download(filename, data, new_data, head_data)
 
         return True
     except BaseException:
         logger.info('Failed to download the pair: "%s", Interval: %s', pair, tick_interval)
         return False
 
+
+def download_pairs_history(datadir: Optional[Path],
+                           exchange: Exchange, pairs: List[str], tick_interval: str = '5m',
+                           timerange: Optional[TimeRange] = None) -> List[str]:
+    """
+    Download the latest ticker intervals for multiple pairs at once.
+    Works like download_pair_history, but the requests of all pairs are issued
+    concurrently by the exchange so network latency overlaps.
+    Files are written from the calling thread once all downloads are done.
+    :param pairs: list of pairs to download
+    :param tick_interval: ticker interval
+    :param timerange: range of time to download
+    :return: list of pairs which failed to download
+    """
+    prepared: Dict[str, Tuple[Path, np.ndarray, int, Optional[int]]] = {}
+    failed: List[str] = []
+    for pair in pairs:
+        try:
+            prepared[pair] = _prepare_pair_download(datadir, pair, tick_interval, timerange)
+        except BaseException:
+            logger.info('Failed to download the pair: "%s", Interval: %s', pair, tick_interval)
+            failed.append(pair)
+
+    logger.info('Download %s pairs, Interval: %s', len(prepared), tick_interval)
+    downloaded = exchange.get_histories(
+        {pair: since_ms for pair, (_, _, since_ms, _) in prepared.items()}, tick_interval)
+
+    # Data missing before the cached candles
+    heads = {pair: (prepend_since_ms, int(data['date'][0]))
+             for pair, (_, data, _, prepend_since_ms) in prepared.items()
+             if prepend_since_ms and pair in downloaded}
+    downloaded_heads = exchange.get_histories(
+        {pair: since for pair, (since, _) in heads.items()}, tick_interval,
+        pairs_until={pair: until for pair, (_, until) in heads.items()}) if heads else {}
+
+    for pair, (filename, data, _, _) in prepared.items():
+        if pair not in downloaded or (pair in heads and pair not in downloaded_heads):
+            logger.info('Failed to download the pair: "%s", Interval: %s', pair, tick_interval)
+            failed.append(pair)
+            continue
+        _store_pair_download(filename, data, downloaded[pair], downloaded_heads.get(pair))
+    return failed
@@ -20,6 +20,9 @@ logger = logging.getLogger(__name__)
 
 API_RETRY_COUNT = 4
 
+# Number of candle history requests per pair which are in flight at the same time
+HISTORY_FETCH_WINDOW = 8
+
 # Urls to exchange markets, insert quote and base with .format()
 _EXCHANGE_URLS = {
     ccxt.bittrex.__name__: '/Market/Index?MarketName={quote}-{base}',
@@ -27,7 +30,7 @@ _EXCHANGE_URLS = {
 }
 
 
-def retrier_aync(f):
+def retrier_async(f):
     async def wrapper(*args, **kwargs):
         count = kwargs.pop('count', API_RETRY_COUNT)
         try:
@@ -163,11 +166,22 @@ class Exchange(object):
         return self._api.id
 
     def klines(self, pair_interval: Tuple[str, str], copy=True) -> DataFrame:
+        """
+        Return the cached candles of a pair as DataFrame
+        :param copy: return a copy. With copy=False the cached DataFrame is returned,
+                     callers must not modify it.
+        """
         if pair_interval in self._klines:
             return self._klines[pair_interval].copy() if copy else self._klines[pair_interval]
         else:
             return DataFrame()
 
+    def klines_keys(self) -> List[Tuple[str, str]]:
+        """
+        Return the (pair, ticker_interval) combinations for which candles are cached
+        """
+        return list(self._klines.keys())
+
     def set_sandbox(self, api, exchange_config: dict, name: str):
         if exchange_config.get('sandbox'):
             if api.urls.get('test'):
@@ -467,34 +481,83 @@ class Exchange(object):
             return self._cached_ticker[pair]
 
     def get_history(self, pair: str, tick_interval: str,
-                    since_ms: int) -> List:
+                    since_ms: int, until_ms: Optional[int] = None) -> List:
         """
         Gets candle history using asyncio and returns the list of candles.
         Handles all async doing.
+        :param until_ms: only return candles before this timestamp (default: up to now)
         """
         return asyncio.get_event_loop().run_until_complete(
             self._async_get_history(pair=pair, tick_interval=tick_interval,
-                                    since_ms=since_ms))
+                                    since_ms=since_ms, until_ms=until_ms))
+
+    def get_histories(self, pairs_since: Dict[str, int], tick_interval: str,
+                      pairs_until: Optional[Dict[str, int]] = None) -> Dict[str, List]:
+        """
+        Gets candle history for multiple pairs concurrently and returns the candles per pair.
+        All pairs are gathered on the same event loop, so network latency of the
+        different pairs overlaps; throttling is left to ccxt's rate limiter.
+        :param pairs_since: dict of pair: since_ms
+        :param pairs_until: dict of pair: until_ms, pairs not listed are downloaded up to now
+        :return: dict of pair: candle list. Pairs raising an exception are omitted.
+        """
+        pairs = list(pairs_since.keys())
+        pairs_until = pairs_until or {}
+        input_coroutines = [self._async_get_history(pair=pair, tick_interval=tick_interval,
+                                                    since_ms=pairs_since[pair],
+                                                    until_ms=pairs_until.get(pair))
+                            for pair in pairs]
+
+        histories = asyncio.get_event_loop().run_until_complete(
+            asyncio.gather(*input_coroutines, return_exceptions=True))
+
+        result: Dict[str, List] = {}
+        for pair, res in zip(pairs, histories):
+            if isinstance(res, BaseException):
+                logger.warning("Async code raised an exception for %s: %s",
+                               pair, res.__class__.__name__)
+                continue
+            result[pair] = res
+        return result
 
     async def _async_get_history(self, pair: str,
                                  tick_interval: str,
-                                 since_ms: int) -> List:
+                                 since_ms: int,
+                                 until_ms: Optional[int] = None,
+                                 window: int = HISTORY_FETCH_WINDOW) -> List:
+        """
+        Asyncronously gets the candle history of a pair, page by page.
+        Pages are requested in a sliding window: at most `window` requests are in flight,
+        the next page is requested as soon as one of them returns.
+        """
         # Assume exchange returns 500 candles
         _LIMIT = 500
 
         one_call = constant.TICKER_INTERVAL_MINUTES[tick_interval] * 60 * _LIMIT * 1000
         logger.debug("one_call: %s", one_call)
-        input_coroutines = [self._async_get_candle_history(
-            pair, tick_interval, since) for since in
-            range(since_ms, arrow.utcnow().timestamp * 1000, one_call)]
+        semaphore = asyncio.Semaphore(window)
+
+        async def fetch_page(since: int) -> Tuple[str, str, List]:
+            async with semaphore:
+                return await self._async_get_candle_history(pair, tick_interval, since)
+
+        input_coroutines = [fetch_page(since) for since in
+                            range(since_ms, until_ms or arrow.utcnow().timestamp * 1000, one_call)]
 
         tickers = await asyncio.gather(*input_coroutines, return_exceptions=True)
 
         # Combine tickers
         data: List = []
-        for p, ticker_interval, ticker in tickers:
+        for res in tickers:
+            if isinstance(res, BaseException):
+                # a missing page would leave a gap in the history
+                raise res
+            p, ticker_interval, ticker = res
             if p == pair:
                 data.extend(ticker)
+        if until_ms:
+            # the last call returns candles up to its limit, even after until_ms
+            data = [x for x in data if x[0] < until_ms]
         # Sort data again after extending the result - above calls return in "async order"
         data = sorted(data, key=lambda x: x[0])
         logger.info("downloaded %s with length %s.", pair, len(data))
@@ -1,12 +1,15 @@
 import gzip
 import logging
+import os
 import re
 from datetime import datetime
-from typing import Dict
+from pathlib import Path
+from typing import Any, Dict
 
 import numpy as np
+import orjson
 from pandas import DataFrame
-import rapipjson
+import rapidjson
 
 logger = logging.getLogger(__name__)
 
@@ -73,6 +76,40 @@ def file_dump_json(filename, data, is_zip= False)-> None:
     logger.debug(f'done json to "{filename}"')
 
 
+def file_append_json(filename: Path, data: list, replace_last: bool = False) -> None:
+    """
+    Append items to the JSON list stored in a file, without rewriting the whole file.
+    Only the tail of the file is read, the new items are written in place of the closing bracket.
+    :param filename: file containing a JSON list (not gzipped)
+    :param data: items to append
+    :param replace_last: drop the last stored item first, the last item must be a flat list
+                         (e.g. a candle). Without such an item, data is only appended
+    :return:
+    """
+    logger.info(f'appending json to "{filename}"')
+
+    with open(filename, 'r+b') as fp:
+        size = fp.seek(0, os.SEEK_END)
+        tail_start = max(0, size - 4096)
+        fp.seek(tail_start)
+        tail = fp.read()
+        pos = tail.rindex(b']')
+        if replace_last:
+            item_pos = tail.rindex(b'[', 0, pos)
+            # Only replace when the bracket opens an item and not the list itself (e.g. "[]")
+            if tail[:item_pos].rstrip()[-1:] in (b'[', b','):
+                pos = item_pos
+            else:
+                logger.debug(f'no item to replace in "{filename}", appending')
+        previous = tail[:pos].rstrip()[-1:]
+        separator = b'' if previous in (b'[', b',') else b','
+        fp.seek(tail_start + pos)
+        fp.write(separator + b','.join(orjson.dumps(item) for item in data) + b']')
+        fp.truncate()
+
+    logger.debug(f'done appending json to "{filename}"')
+
+
 def json_load(datafile):
     """
     load data with rapidjson
@@ -82,6 +119,19 @@ def json_load(datafile):
     return rapidjson.load(datafile, number_mode=rapidjson.NM_NATIVE)
 
 
+def json_load_file(file: Path) -> Any:
+    """
+    load a .json or .json.gz file with orjson.
+    The file is read in one go, gzip data (all members) is inflated in memory and
+    the result decoded from bytes. The read and the inflate release the GIL,
+    so loading several files from a thread pool runs in parallel.
+    """
+    data = file.read_bytes()
+    if file.suffix == '.gz':
+        data = gzip.decompress(data)
+    return orjson.loads(data)
+
+
 def file_load_json(file):
 
     gzipfile = file.with_suffix(file.suffix + '.gz')
@@ -89,12 +139,10 @@ def file_load_json(file):
     # Try gzip file first, otherwise regular json file.
     if gzipfile.is_file():
         logger.debug('Loading ticker data from file %s', gzipfile)
-        with gzip.open(gzipfile) as tickerdata:
-            pairdata = json_load(tickerdata)
+        pairdata = json_load_file(gzipfile)
     elif file.is_file():
         logger.debug('Loading ticker data from file %s', file)
-        with open(file) as tickerdata:
-            pairdata = json_load(tickerdata)
+        pairdata = json_load_file(file)
     else:
         return None
     return pairdata